@@ -1,20 +1,31 @@
+import threading
+import urllib.parse
 from typing import List, Tuple, Dict, Any, Optional
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from fastapi import Response
 from app.plugins import _PluginBase
 from app.core.event import eventmanager, EventType, Event
-from app.schemas.types import MessageChannel
+from app.schemas.types import MessageChannel, MediaType
+from app.db.subscribe_oper import SubscribeOper
+from app.chain.tmdb import TmdbChain
 from app.helper.downloader import DownloaderHelper
 from app.helper.notification import NotificationHelper
 from app.log import logger
 from .api_nullbr import NullbrClient
-from .api_cd2 import CloudDrive2Client
+from .api_cd2 import CloudDrive2Client, CloudDrive2Pool
+from .scheduler import FairScheduler
+from .tracker import TransferTracker
+from .models import SearchItem, Share115, Magnet
+from .taskstore import TaskStateStore
+from .posters import PosterCache
 
 class NullbrCd2(_PluginBase):
     # 插件元数据
     plugin_name = "NullbrCD2"
     plugin_desc = "Nullbr资源搜索与CloudDrive2联动插件"
     plugin_icon = "https://raw.githubusercontent.com/jxxghp/MoviePilot-Plugins/main/icons/torrenttransfer.jpg"
-    plugin_version = "1.2"
+    plugin_version = "2.1"
     plugin_author = "Developer"
     plugin_config_prefix = "nullbrcd2_"
     plugin_order = 10
@@ -24,11 +35,18 @@ class NullbrCd2(_PluginBase):
     _enabled = False
     _config = {}
     _nullbr_client: NullbrClient = None
-    _cd2_client: CloudDrive2Client = None
-    _last_tasks = set()
+    _cd2_pool: CloudDrive2Pool = None
+    # 构建客户端所用的配置，未变化时复用已有客户端及其连接池/Token
+    _nullbr_signature: tuple = None
+    _cd2_signature: tuple = None
+    _scheduler: FairScheduler = None
+    _transfer_tracker: TransferTracker = None
+    _task_store: TaskStateStore = None
+    _poster_cache: PosterCache = None
+    _warmup_trigger: CronTrigger = None
     
     # 页面状态
-    _search_results: List[Dict] = []
+    _search_results: List[SearchItem] = []
     _search_keyword: str = ""
 
     def init_plugin(self, config: dict = None):
@@ -41,23 +59,108 @@ class NullbrCd2(_PluginBase):
         self.nullbr_cookie = self._config.get("nullbr_cookie", "")
         self.api_key = self._config.get("api_key", "")
         self.app_id = self._config.get("app_id", "")
+        self.nullbr_credentials = self._config.get("nullbr_credentials", "")
         self.cd2_host = self._config.get("cd2_host", "http://localhost:19798")
         self.cd2_user = self._config.get("cd2_user", "admin")
         self.cd2_password = self._config.get("cd2_password", "")
+        self.cd2_nodes = self._config.get("cd2_nodes", "")
         self.cd2_115_mount_path = self._config.get("cd2_115_mount_path", "/115")
         self.resource_priority = self._config.get("resource_priority", "115,magnet,ed2k,m3u8")
         self.download_mode = self._config.get("download_mode", "115")
+        self.max_concurrency = int(self._config.get("max_concurrency") or 2)
+        self.warmup_enabled = self._config.get("warmup_enabled", False)
+        self.warmup_cron = self._config.get("warmup_cron") or "0 4 * * *"
+        self._warmup_trigger = None
+        if self.warmup_enabled:
+            try:
+                self._warmup_trigger = CronTrigger.from_crontab(self.warmup_cron)
+            except Exception as e:
+                logger.error(f"NullbrCD2 invalid warmup cron '{self.warmup_cron}', warmup disabled: {e}")
+        self.cache_ttl_hours = float(self._config.get("cache_ttl_hours") or 24)
+        self.warmup_budget = int(self._config.get("warmup_budget") or 50)
+        self.warmup_trending = self._config.get("warmup_trending", False)
+        self.poster_cache_mb = int(self._config.get("poster_cache_mb") or 200)
+
+        if self._scheduler and (not self._enabled or self._scheduler.max_workers != self.max_concurrency):
+            # 并发数变化时由新调度器接管排队中的任务，已收到排队提示的用户仍会得到结果
+            scheduler = FairScheduler(self.max_concurrency) if self._enabled else None
+            self._scheduler.shutdown(scheduler)
+            self._scheduler = scheduler
 
         if self._enabled:
             logger.info(f"Loading NullbrCD2 plugin... Host: {self.cd2_host}")
-            self._nullbr_client = NullbrClient(self.app_id, self.api_key, self.nullbr_cookie)
-            self._cd2_client = CloudDrive2Client(self.cd2_host, self.cd2_user, self.cd2_password)
+            if self._build_clients():
+                # 登录与建连放到后台，避免阻塞配置保存及首个用户请求
+                threading.Thread(target=self._warmup_clients, name="nullbrcd2-warmup", daemon=True).start()
+            self._nullbr_client.cache_ttl = self.cache_ttl_hours * 3600
+            if not self._scheduler:
+                self._scheduler = FairScheduler(self.max_concurrency)
+            if not self._transfer_tracker:
+                self._transfer_tracker = TransferTracker()
+            if not self._task_store:
+                self._task_store = TaskStateStore()
+            if not self._poster_cache:
+                self._poster_cache = PosterCache(self.get_data_path() / "posters", self.poster_cache_mb * 1024 * 1024)
+            else:
+                self._poster_cache.resize(self.poster_cache_mb * 1024 * 1024)
+
+    def _build_clients(self) -> bool:
+        """
+        按配置构建客户端，配置未变化时复用已有实例
+        :return: 是否有客户端被重建
+        """
+        rebuilt = False
+        credentials = self._parse_config_lines(self.nullbr_credentials, 2)
+        nullbr_signature = (self.app_id, self.api_key, self.nullbr_cookie, tuple(credentials))
+        if not self._nullbr_client or nullbr_signature != self._nullbr_signature:
+            self._nullbr_client = NullbrClient(self.app_id, self.api_key, self.nullbr_cookie, credentials)
+            self._nullbr_signature = nullbr_signature
+            rebuilt = True
+        nodes = [(self.cd2_host, self.cd2_user, self.cd2_password)] + self._parse_config_lines(self.cd2_nodes, 3)
+        cd2_signature = tuple(nodes)
+        # 有节点未登录成功 (或 Token 已被判定失效) 时也重建，保存配置即可重新登录并清除冷却
+        if not self._cd2_pool or cd2_signature != self._cd2_signature \
+                or any(not client.token for client in self._cd2_pool.nodes):
+            self._cd2_pool = CloudDrive2Pool([CloudDrive2Client(*node) for node in nodes])
+            self._cd2_signature = cd2_signature
+            rebuilt = True
+        return rebuilt
+
+    def _warmup_clients(self):
+        """
+        预建立 Nullbr 连接、登录各 CD2 节点并获取初始负载
+        """
+        if self._nullbr_client:
+            self._nullbr_client.warmup()
+        if self._cd2_pool:
+            self._cd2_pool.warmup()
+            self._cd2_pool.refresh_loads()
+
+    @staticmethod
+    def _parse_config_lines(text: str, fields: int) -> List[Tuple[str, ...]]:
+        """
+        解析多行配置，每行以 | 分隔 fields 个字段，如 CD2 节点 (地址|用户名|密码)、Nullbr 凭证 (App ID|API Key)
+        """
+        entries = []
+        for line in (text or "").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) != fields:
+                logger.warning(f"NullbrCD2 ignoring invalid config line: {parts[0]}")
+                continue
+            entries.append(tuple(parts))
+        return entries
 
     def get_state(self) -> bool:
         return self._enabled
 
     def stop_service(self):
         self._enabled = False
+        if self._scheduler:
+            self._scheduler.shutdown()
+            self._scheduler = None
 
     def get_command(self) -> List[Dict[str, Any]]:
         return [{
@@ -73,34 +176,109 @@ class NullbrCd2(_PluginBase):
     def get_service(self) -> List[Dict[str, Any]]:
         if not self._enabled:
             return []
-        return [{
+        services = [{
             "id": "nullbrcd2_monitor",
             "name": "NullbrCD2 任务监控",
             "trigger": CronTrigger.from_crontab("*/5 * * * *"),
             "func": self.sync_task,
             "kwargs": {}
+        }, {
+            "id": "nullbrcd2_transfers",
+            "name": "NullbrCD2 传输进度采样",
+            "trigger": IntervalTrigger(seconds=TransferTracker.INTERVAL),
+            "func": self.sample_transfers,
+            "kwargs": {}
         }]
+        if self._warmup_trigger:
+            services.append({
+                "id": "nullbrcd2_warmup",
+                "name": "NullbrCD2 资源缓存预热",
+                "trigger": self._warmup_trigger,
+                "func": self.warmup_cache,
+                "kwargs": {}
+            })
+        return services
+
+    def warmup_cache(self):
+        """
+        预取订阅 (及热门) 影视的 115/磁力资源，上游请求数不超过 warmup_budget
+        """
+        if not self._enabled or not self._nullbr_client:
+            return
+        targets = self._warmup_targets()
+        client = self._nullbr_client
+        # 按当前线程计数，不把同时段用户触发的请求算入预算
+        start = client.thread_request_count
+        warmed = 0
+        for media_type, tmdb_id in targets:
+            if client.thread_request_count - start >= self.warmup_budget:
+                break
+            self._fetch_115(media_type, tmdb_id)
+            if client.thread_request_count - start >= self.warmup_budget:
+                break
+            self._fetch_magnet(media_type, tmdb_id)
+            warmed += 1
+        logger.info(f"NullbrCD2 cache warmup: {warmed}/{len(targets)} titles, "
+                    f"{client.thread_request_count - start} upstream requests")
+
+    def _warmup_targets(self) -> List[Tuple[str, int]]:
+        """
+        预热目标 (media_type, tmdb_id)，订阅在前、热门在后
+        """
+        targets = []
+        try:
+            for subscribe in SubscribeOper().list() or []:
+                if subscribe.tmdbid:
+                    media_type = "movie" if subscribe.type == MediaType.MOVIE.value else "tv"
+                    targets.append((media_type, int(subscribe.tmdbid)))
+        except Exception as e:
+            logger.error(f"NullbrCD2 load subscribes failed: {e}")
+        if self.warmup_trending:
+            try:
+                for media in TmdbChain().tmdb_trending(page=1) or []:
+                    if media.tmdb_id:
+                        media_type = "movie" if media.type == MediaType.MOVIE else "tv"
+                        targets.append((media_type, int(media.tmdb_id)))
+            except Exception as e:
+                logger.error(f"NullbrCD2 load trending failed: {e}")
+        return list(dict.fromkeys(targets))
 
     def sync_task(self):
-        if not self._enabled or not self._cd2_client:
+        if not self._enabled or not self._cd2_pool:
             return
         logger.debug("NullbrCD2 checking offline tasks...")
-        offline_tasks = self._cd2_client.get_offline_tasks()
-        if not offline_tasks:
+        # 刷新负载时获取的离线任务列表直接用于完成检测，不重复请求
+        for node, offline_tasks in self._cd2_pool.refresh_loads().items():
+            for task in self._task_store.update(node, offline_tasks):
+                logger.info(f"NullbrCD2 task completed: {task.name}")
+                NotificationHelper().send_message(
+                    title="下载完成",
+                    text=f"离线任务已完成：{task.name}"
+                )
+
+    def sample_transfers(self):
+        """
+        采样 CD2 传输任务进度，页面与 API 只读取缓存的统计
+        """
+        if not self._enabled or not self._cd2_pool or not self._transfer_tracker:
             return
-        current_completed = set()
-        for task in offline_tasks:
-            task_id = task.get("id") or task.get("name")
-            status = task.get("status")
-            if status == "Success" or status == 2: 
-                current_completed.add(task_id)
-                if task_id not in self._last_tasks:
-                    logger.info(f"NullbrCD2 task completed: {task.get('name')}")
-                    NotificationHelper().send_message(
-                        title="下载完成",
-                        text=f"离线任务已完成：{task.get('name')}"
-                    )
-        self._last_tasks = current_completed
+        self._transfer_tracker.update(self._cd2_pool.get_transfer_tasks())
+
+    @staticmethod
+    def _format_size(size: float) -> str:
+        for unit in ("B", "KB", "MB", "GB"):
+            if size < 1024:
+                return f"{size:.1f} {unit}"
+            size /= 1024
+        return f"{size:.1f} TB"
+
+    @staticmethod
+    def _format_duration(seconds: Optional[int]) -> str:
+        if seconds is None:
+            return "未知"
+        hours, rest = divmod(seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
 
     @eventmanager.register(EventType.PluginAction)
     def command_event(self, event: Event):
@@ -117,8 +295,21 @@ class NullbrCd2(_PluginBase):
                 channel = event_data.get("channel")
                 user_id = event_data.get("user")
                 logger.info(f"NullbrCD2 searching for: {keyword}")
-                self.post_message(channel=channel, title="🔍 正在搜索...", text=f"关键词: {keyword}", userid=user_id)
-                self._search_and_reply(keyword, channel, user_id)
+                # 排队提示在任务进入队列前发送，保证先于搜索结果
+                position = self._scheduler.submit(
+                    str(user_id), None, self._search_and_reply, keyword, channel, user_id,
+                    on_queued=lambda pos: self.post_message(
+                        channel=channel, title="🔍 正在搜索...",
+                        text=f"关键词: {keyword}{self._queue_hint(pos)}", userid=user_id))
+                if position == FairScheduler.STOPPED:
+                    self.post_message(channel, title="❌ 错误", text="插件正在重新加载，请稍后重试", userid=user_id)
+
+    @staticmethod
+    def _queue_hint(position: Optional[int]) -> str:
+        """
+        排队位置提示
+        """
+        return f"\n排队中，前方还有 {position} 个任务" if position else ""
 
     def _search_and_reply(self, keyword: str, channel: MessageChannel, user_id: str):
         if not self._nullbr_client:
@@ -128,21 +319,16 @@ class NullbrCd2(_PluginBase):
             self.post_message(channel, title="搜索结果", text="未找到相关资源", userid=user_id)
             return
         for item in results[:5]:
-            title = item.get("title")
-            overview = item.get("overview", "")[:100] + "..."
-            poster = item.get("poster")
-            if poster and not poster.startswith("http"):
-                poster = f"https://image.tmdb.org/t/p/w500{poster}"
-            tmdb_id = item.get("tmdbid")
-            media_type = item.get("media_type")
+            media_type, tmdb_id = item.media_type, item.tmdb_id
             buttons = []
-            if item.get("115-flg") == 1:
+            if item.has_115:
                 buttons.append({"text": "💾 115转存", "callback_data": f"[PLUGIN]NullbrCd2|dl:115:{media_type}:{tmdb_id}"})
-            if item.get("magnet-flg") == 1:
+            if item.has_magnet:
                 buttons.append({"text": "🧲 磁力下载", "callback_data": f"[PLUGIN]NullbrCd2|dl:mag:{media_type}:{tmdb_id}"})
             if buttons:
                 formatted_buttons = [buttons[i:i+2] for i in range(0, len(buttons), 2)]
-                self.post_message(channel=channel, title=f"🎬 {title}", text=overview, image=poster, userid=user_id, buttons=formatted_buttons)
+                self.post_message(channel=channel, title=f"🎬 {item.title}", text=item.message_overview,
+                                  image=item.poster, userid=user_id, buttons=formatted_buttons)
 
     @eventmanager.register(EventType.MessageAction)
     def message_event(self, event: Event):
@@ -161,59 +347,74 @@ class NullbrCd2(_PluginBase):
             try:
                 _, dl_type, media_type, tmdb_id = callback_data.split(":")
                 tmdb_id = int(tmdb_id)
-                self.post_message(channel, title="⏳ 处理中", text="正在请求资源...", userid=user_id)
-                if dl_type == "115":
-                    self._handle_download_115(channel, user_id, media_type, tmdb_id)
-                elif dl_type == "mag":
-                    self._handle_download_magnet(channel, user_id, media_type, tmdb_id)
-            except Exception as e:
+            except ValueError as e:
                 logger.error(f"NullbrCD2 action failed: {e}")
                 self.post_message(channel, title="❌ 错误", text=f"操作处理失败: {str(e)}", userid=user_id)
+                return
+            # 同一用户对同一资源的重复点击在排队或执行期间合并为一次
+            position = self._scheduler.submit(
+                str(user_id), f"{user_id}|{callback_data}", self._handle_download,
+                channel, user_id, dl_type, media_type, tmdb_id,
+                on_queued=lambda pos: self.post_message(
+                    channel, title="⏳ 处理中", text=f"正在请求资源...{self._queue_hint(pos)}", userid=user_id))
+            if position is None:
+                self.post_message(channel, title="⏳ 处理中", text="相同任务正在处理，请勿重复点击", userid=user_id)
+            elif position == FairScheduler.STOPPED:
+                self.post_message(channel, title="❌ 错误", text="插件正在重新加载，请稍后重试", userid=user_id)
 
-    def _handle_download_115(self, channel, user_id, media_type, tmdb_id):
-        resources = []
+    def _handle_download(self, channel, user_id, dl_type, media_type, tmdb_id):
+        try:
+            if dl_type == "115":
+                self._handle_download_115(channel, user_id, media_type, tmdb_id)
+            elif dl_type == "mag":
+                self._handle_download_magnet(channel, user_id, media_type, tmdb_id)
+        except Exception as e:
+            logger.error(f"NullbrCD2 action failed: {e}")
+            self.post_message(channel, title="❌ 错误", text=f"操作处理失败: {str(e)}", userid=user_id)
+
+    def _fetch_115(self, media_type: str, tmdb_id: int) -> List[Share115]:
         if media_type == "movie":
-            resources = self._nullbr_client.get_movie_115(tmdb_id)
-        elif media_type == "tv":
-            resources = self._nullbr_client.get_tv_115(tmdb_id)
+            return self._nullbr_client.get_movie_115(tmdb_id)
+        if media_type == "tv":
+            return self._nullbr_client.get_tv_115(tmdb_id)
+        return []
+
+    def _fetch_magnet(self, media_type: str, tmdb_id: int) -> List[Magnet]:
+        if media_type == "movie":
+            return self._nullbr_client.get_movie_magnet(tmdb_id)
+        if media_type == "tv":
+            return self._nullbr_client.get_tv_season_magnet(tmdb_id, 1)
+        return []
+
+    def _handle_download_115(self, channel, user_id, media_type, tmdb_id):
+        resources = self._fetch_115(media_type, tmdb_id)
         if not resources:
             self.post_message(channel, title="❌ 失败", text="未获取到 115 资源链接", userid=user_id)
             return
         resource = resources[0]
-        share_link = resource.get("share_link")
-        password = ""
-        if "password=" in share_link:
-            import urllib.parse
-            parsed = urllib.parse.urlparse(share_link)
-            qs = urllib.parse.parse_qs(parsed.query)
-            password = qs.get("password", [""])[0]
-        success = self._cd2_client.transfer_115_share(share_link, self.cd2_115_mount_path, password)
+        success = self._cd2_pool.transfer_115_share(resource.share_link, self.cd2_115_mount_path, resource.password)
         if success:
-            self.post_message(channel, title="✅ 转存成功", text=f"任务已提交到 CloudDrive2\n{resource.get('title')}", userid=user_id)
+            self.post_message(channel, title="✅ 转存成功", text=f"任务已提交到 CloudDrive2\n{resource.title}", userid=user_id)
         else:
             self.post_message(channel, title="❌ 转存失败", text="CloudDrive2 接口调用失败，请检查日志", userid=user_id)
 
     def _handle_download_magnet(self, channel, user_id, media_type, tmdb_id):
-        resources = []
-        if media_type == "movie":
-            resources = self._nullbr_client.get_movie_magnet(tmdb_id)
-        elif media_type == "tv":
-            resources = self._nullbr_client.get_tv_season_magnet(tmdb_id, 1)
+        resources = self._fetch_magnet(media_type, tmdb_id)
         if not resources:
             self.post_message(channel, title="❌ 失败", text="未获取到磁力资源", userid=user_id)
             return
         resource = resources[0]
-        magnet_link = resource.get("magnet")
+        magnet_link = resource.magnet
         if self.download_mode == "MoviePilot":
             try:
                 DownloaderHelper().add_download_task(magnet_link)
-                self.post_message(channel, title="✅ 下载添加成功", text=f"任务已提交到 MoviePilot 下载器\n{resource.get('name')}", userid=user_id)
+                self.post_message(channel, title="✅ 下载添加成功", text=f"任务已提交到 MoviePilot 下载器\n{resource.name}", userid=user_id)
             except Exception as e:
                 self.post_message(channel, title="❌ 下载添加失败", text=f"MoviePilot 下载器调用失败: {str(e)}", userid=user_id)
         else:
-            success = self._cd2_client.add_offline_task(magnet_link, self.cd2_115_mount_path)
+            success = self._cd2_pool.add_offline_task(magnet_link, self.cd2_115_mount_path)
             if success:
-                self.post_message(channel, title="✅ 离线添加成功", text=f"离线任务已提交到 CloudDrive2\n{resource.get('name')}", userid=user_id)
+                self.post_message(channel, title="✅ 离线添加成功", text=f"离线任务已提交到 CloudDrive2\n{resource.name}", userid=user_id)
             else:
                 self.post_message(channel, title="❌ 离线添加失败", text="CloudDrive2 接口调用失败，请检查日志", userid=user_id)
 
@@ -236,6 +437,22 @@ class NullbrCd2(_PluginBase):
                 "summary": "下载资源",
                 "description": "下载指定资源"
             },
+            {
+                "path": "/transfers",
+                "endpoint": self.api_transfers,
+                "methods": ["GET"],
+                "summary": "传输进度",
+                "description": "CD2 传输任务总速率、剩余时间及任务明细"
+            },
+            {
+                "path": "/poster",
+                "endpoint": self.api_poster,
+                "methods": ["GET"],
+                # 供 <img> 直接引用，不在地址中携带 API Token；仅为当前搜索结果回源，其余路径只读缓存
+                "allow_anonymous": True,
+                "summary": "海报缩略图",
+                "description": "从本地缓存返回 w200 海报缩略图"
+            },
             {
                 "path": "/clear",
                 "endpoint": self.api_clear,
@@ -269,13 +486,47 @@ class NullbrCd2(_PluginBase):
         # 这里的 channel 设为 None，因为 Web 点击没有上下文 Channel，日志会记录，或者可以尝试发给默认管理员？
         # 为了简化，Web端操作只依赖 Web 反馈，通知通过 sync_task 完成
         try:
-            if dl_type == "115":
-                self._handle_download_115(None, None, media_type, int(tmdb_id))
-            elif dl_type == "mag":
-                self._handle_download_magnet(None, None, media_type, int(tmdb_id))
-            return {"code": 0, "message": "任务已提交"}
-        except Exception as e:
+            tmdb_id = int(tmdb_id)
+        except (TypeError, ValueError) as e:
             return {"code": 500, "message": str(e)}
+        position = self._scheduler.submit("web", f"web|dl:{dl_type}:{media_type}:{tmdb_id}", self._handle_download,
+                                          None, None, dl_type, media_type, tmdb_id)
+        if position is None:
+            return {"code": 0, "message": "相同任务正在处理"}
+        if position == FairScheduler.STOPPED:
+            return {"code": 500, "message": "插件正在重新加载，请稍后重试"}
+        return {"code": 0, "message": f"任务已提交{self._queue_hint(position).strip()}", "position": position}
+
+    def api_transfers(self):
+        """
+        API: 传输进度
+        """
+        if not self._enabled or not self._transfer_tracker:
+            return {"code": 500, "message": "插件未启用"}
+        return {"code": 0, "message": "Success", "data": self._transfer_tracker.stats()}
+
+    def api_poster(self, path: str):
+        """
+        API: 海报缩略图
+        """
+        if not self._poster_cache:
+            return Response(status_code=404)
+        # 接口无需认证，仅为当前搜索结果中的海报回源下载，其余路径只读缓存
+        fetch = any(item.poster_path == path for item in self._search_results)
+        content = self._poster_cache.get(path, fetch=fetch)
+        if not content:
+            return Response(status_code=404)
+        media_type = "image/png" if path.endswith(".png") else "image/webp" if path.endswith(".webp") else "image/jpeg"
+        return Response(content=content, media_type=media_type,
+                        headers={"Cache-Control": "private, max-age=2592000, immutable"})
+
+    def _poster_url(self, item: SearchItem) -> Optional[str]:
+        """
+        Web 页面海报地址，TMDB 海报走本地缓存代理
+        """
+        if self._poster_cache and PosterCache.is_valid(item.poster_path):
+            return f"/api/v1/plugin/NullbrCd2/poster?path={urllib.parse.quote(item.poster_path)}"
+        return item.poster_thumb
 
     def api_clear(self):
         """
@@ -352,6 +603,22 @@ class NullbrCd2(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 12},
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'nullbr_credentials',
+                                            'label': '额外 Nullbr 凭证',
+                                            'rows': 3,
+                                            'placeholder': 'App ID|API Key',
+                                            'hint': '每行一组凭证，请求按剩余配额轮换，触发限流的凭证会暂停使用'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -420,6 +687,22 @@ class NullbrCd2(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 12},
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'cd2_nodes',
+                                            'label': '额外 CD2 节点',
+                                            'rows': 3,
+                                            'placeholder': 'http://192.168.1.2:19798|admin|password',
+                                            'hint': '每行一个节点，格式：地址|用户名|密码。任务将分派到队列最短的可用节点'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -464,6 +747,123 @@ class NullbrCd2(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'max_concurrency',
+                                            'label': '最大并发任务数',
+                                            'type': 'number',
+                                            'placeholder': '2',
+                                            'hint': '搜索/下载请求按用户轮流执行，同时执行的任务数不超过该值'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 12},
+                                'content': [
+                                    {'component': 'div', 'text': '缓存预热', 'class': 'text-h6 mt-4 mb-2'}
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'warmup_enabled',
+                                            'label': '启用预热'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'warmup_trending',
+                                            'label': '包含热门榜单'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'warmup_cron',
+                                            'label': '预热周期',
+                                            'placeholder': '0 4 * * *',
+                                            'hint': 'Cron 表达式，建议设置在闲时'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'warmup_budget',
+                                            'label': '单次请求上限',
+                                            'type': 'number',
+                                            'placeholder': '50',
+                                            'hint': '每次预热最多发往 Nullbr 的请求数'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'cache_ttl_hours',
+                                            'label': '资源缓存时长 (小时)',
+                                            'type': 'number',
+                                            'placeholder': '24',
+                                            'hint': '应不短于预热周期，否则预热结果会在使用前过期'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'poster_cache_mb',
+                                            'label': '海报缓存上限 (MB)',
+                                            'type': 'number',
+                                            'placeholder': '200',
+                                            'hint': 'Web 页面海报缓存到本地，超出后淘汰最久未访问的'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     }
@@ -473,13 +873,22 @@ class NullbrCd2(_PluginBase):
             "enabled": False,
             "app_id": "",
             "api_key": "",
+            "nullbr_credentials": "",
             "nullbr_cookie": "",
             "cd2_host": "http://localhost:19798",
             "cd2_user": "admin",
             "cd2_password": "",
+            "cd2_nodes": "",
             "cd2_115_mount_path": "/115",
             "resource_priority": "115,magnet,ed2k,m3u8",
-            "download_mode": "115"
+            "download_mode": "115",
+            "max_concurrency": 2,
+            "warmup_enabled": False,
+            "warmup_trending": False,
+            "warmup_cron": "0 4 * * *",
+            "warmup_budget": 50,
+            "cache_ttl_hours": 24,
+            "poster_cache_mb": 200
         }
 
     def get_page(self) -> List[dict]:
@@ -489,28 +898,34 @@ class NullbrCd2(_PluginBase):
         if not self._enabled:
             return [{'component': 'div', 'text': '插件未启用', 'class': 'text-h6 text-center mt-10'}]
 
+        transfer_text = "暂无传输任务"
+        if self._transfer_tracker:
+            stats = self._transfer_tracker.stats(top=0)
+            if stats["count"]:
+                transfer_text = (f"传输任务 {stats['count']} 个 · "
+                                 f"{self._format_size(stats['transferred'])} / {self._format_size(stats['total'])} · "
+                                 f"{self._format_size(stats['throughput'])}/s · "
+                                 f"剩余 {self._format_duration(stats['eta'])}")
+
         results_cards = []
         if self._search_results:
             for item in self._search_results:
-                poster = item.get("poster")
-                if poster and not poster.startswith("http"):
-                    poster = f"https://image.tmdb.org/t/p/w200{poster}"
-                
-                title = item.get("title")
-                overview = item.get("overview", "")[:80] + "..." if item.get("overview") else ""
-                tmdb_id = item.get("tmdbid")
-                media_type = item.get("media_type")
+                poster = self._poster_url(item)
+                title = item.title
+                overview = item.card_overview
+                tmdb_id = item.tmdb_id
+                media_type = item.media_type
                 
                 # Badges
                 badges = []
-                if item.get("115-flg") == 1:
+                if item.has_115:
                     badges.append({'component': 'VChip', 'text': '115', 'color': 'blue', 'size': 'small', 'class': 'mr-1'})
-                if item.get("magnet-flg") == 1:
+                if item.has_magnet:
                     badges.append({'component': 'VChip', 'text': 'Mag', 'color': 'green', 'size': 'small', 'class': 'mr-1'})
                 
                 # Actions
                 actions = []
-                if item.get("115-flg") == 1:
+                if item.has_115:
                     actions.append({
                         'component': 'VBtn',
                         'props': {'color': 'blue', 'variant': 'text', 'size': 'small'},
@@ -523,7 +938,7 @@ class NullbrCd2(_PluginBase):
                             }
                         }
                     })
-                if item.get("magnet-flg") == 1:
+                if item.has_magnet:
                     actions.append({
                         'component': 'VBtn',
                         'props': {'color': 'green', 'variant': 'text', 'size': 'small'},
@@ -583,6 +998,11 @@ class NullbrCd2(_PluginBase):
                 'component': 'VContainer',
                 'props': {'fluid': True},
                 'content': [
+                    {
+                        'component': 'VAlert',
+                        'props': {'type': 'info', 'variant': 'tonal', 'density': 'compact', 'class': 'mb-4'},
+                        'text': f"CloudDrive2 {transfer_text}"
+                    },
                     {
                         'component': 'VRow',
                         'class': 'align-center mb-4',
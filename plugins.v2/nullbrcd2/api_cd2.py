@@ -1,9 +1,15 @@
 import requests
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, Optional, List, Iterator
+from urllib3.exceptions import NewConnectionError
 from app.log import logger
-import json
+from .models import loads, OfflineTask, TransferTask
 
 class CloudDrive2Client:
+    # 传输任务列表的最大分页数
+    MAX_PAGES = 200
+
     def __init__(self, host: str, username: str = None, password: str = None):
         self.host = host.rstrip("/")
         self.username = username
@@ -11,6 +17,13 @@ class CloudDrive2Client:
         self.token = None
         self.session = requests.Session()
 
+    @property
+    def name(self) -> str:
+        """
+        节点标识，同一地址下不同账号视为不同节点
+        """
+        return f"{self.username}@{self.host}"
+
     def login(self) -> bool:
         """
         登录获取 Token
@@ -27,7 +40,7 @@ class CloudDrive2Client:
         try:
             response = self.session.post(url, json=payload, timeout=10)
             response.raise_for_status()
-            data = response.json()
+            data = loads(response.content)
             if data.get("success"):
                 self.token = data.get("token")
                 self.session.headers.update({"Authorization": f"Bearer {self.token}"})
@@ -35,10 +48,17 @@ class CloudDrive2Client:
             else:
                 logger.error(f"CloudDrive2 login failed: {data.get('errorMessage')}")
                 return False
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             logger.error(f"CloudDrive2 login connection error: {e}")
             return False
 
+    def reset_token(self):
+        """
+        丢弃当前 Token，下次请求时重新登录
+        """
+        self.token = None
+        self.session.headers.pop("Authorization", None)
+
     def _ensure_token(self):
         """
         确保有 Token，如果没有则尝试登录
@@ -46,78 +66,257 @@ class CloudDrive2Client:
         if not self.token:
             self.login()
 
-    def transfer_115_share(self, share_link: str, to_folder: str, password: str = "") -> bool:
+    def _post(self, url: str, payload: Dict[str, Any], timeout: int) -> requests.Response:
+        """
+        发送 POST 请求，Token 失效 (401) 时重新登录并重试一次
+        """
+        self._ensure_token()
+        response = self.session.post(url, json=payload, timeout=timeout)
+        if response.status_code == 401:
+            self.reset_token()
+            if self.login():
+                response = self.session.post(url, json=payload, timeout=timeout)
+        return response
+
+    @staticmethod
+    def _not_sent(error: requests.exceptions.RequestException) -> bool:
+        """
+        请求是否在发出前失败 (无法建立连接)，此时节点一定未处理该请求
+        """
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+            return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+        return False
+
+    def _submit(self, api: str, payload: Dict[str, Any], action: str) -> Optional[bool]:
+        """
+        提交任务类请求
+        :return: 是否成功；请求未被节点处理 (无法连接或认证失败) 时返回 None，可安全地改投其他节点
+        """
+        try:
+            response = self._post(f"{self.host}{api}", payload, timeout=20)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"CloudDrive2 {action} error: {e}")
+            return None if self._not_sent(e) else False
+        if response.status_code == 401:
+            logger.error(f"CloudDrive2 {action} rejected: unauthorized")
+            return None
+        if response.status_code != 200:
+            logger.error(f"CloudDrive2 {action} failed with status: {response.status_code}")
+            return False
+        # CD2 成功通常返回空 200 OK 或 JSON success=True
+        if response.content:
+            try:
+                data = loads(response.content)
+                if isinstance(data, dict) and not data.get("success", True):
+                    logger.error(f"CloudDrive2 {action} failed: {data.get('errorMessage')}")
+                    return False
+            except ValueError:
+                pass # 内容不是 JSON，但状态码是 200，假设成功
+        return True
+
+    def transfer_115_share(self, share_link: str, to_folder: str, password: str = "") -> Optional[bool]:
         """
         转存 115 分享链接
         :param share_link: 分享链接
         :param to_folder: 目标文件夹路径
         :param password: 分享密码 (如有)
+        :return: 是否成功；请求未被节点处理时返回 None
         """
-        self._ensure_token()
-        url = f"{self.host}/api/AddSharedLink"
         payload = {
             "sharedLinkUrl": share_link,
             "sharedPassword": password,
             "toFolder": to_folder
         }
-        try:
-            response = self.session.post(url, json=payload, timeout=20)
-            # CD2 成功通常返回空 200 OK 或 JSON success=True
-            if response.status_code == 200:
-                # 有些版本可能返回 JSON，有些可能只是 Empty
-                if response.content:
-                    try:
-                        data = response.json()
-                        if isinstance(data, dict) and not data.get("success", True):
-                             logger.error(f"CloudDrive2 transfer failed: {data.get('errorMessage')}")
-                             return False
-                    except json.JSONDecodeError:
-                        pass # 内容不是 JSON，但状态码是 200，假设成功
-                return True
-            else:
-                logger.error(f"CloudDrive2 transfer request failed with status: {response.status_code}")
-                return False
-        except requests.exceptions.RequestException as e:
-            logger.error(f"CloudDrive2 transfer error: {e}")
-            return False
+        return self._submit("/api/AddSharedLink", payload, "transfer")
 
-    def get_transfer_tasks(self) -> list:
+    def add_offline_task(self, url: str, to_folder: str) -> Optional[bool]:
         """
-        获取传输任务列表
+        添加 115 离线下载任务
+        :param url: 磁力/Ed2k 链接
+        :param to_folder: 目标文件夹路径
+        :return: 是否成功；请求未被节点处理时返回 None
         """
-        self._ensure_token()
-        url = f"{self.host}/api/GetUploadFileList"
         payload = {
-            "getAll": False,
-            "itemsPerPage": 100,
-            "pageNumber": 0,
-            "filter": ""
+            "urls": url,
+            "toFolder": to_folder,
+            "checkFolderAfterSecs": 0
         }
-        try:
-            response = self.session.post(url, json=payload, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("uploadFiles", [])
-            return []
-        except Exception as e:
-            logger.error(f"CloudDrive2 get transfer tasks error: {e}")
-            return []
+        return self._submit("/api/AddOfflineFiles", payload, "add offline task")
 
-    def get_offline_tasks(self) -> list:
+    def _transfer_pages(self, page_size: int) -> Iterator[Optional[Dict[str, Any]]]:
         """
-        获取离线下载任务列表
+        逐页获取传输任务原始数据，请求失败时产出 None 并结束
+        服务端忽略页码时会重复返回同一页，此时或达到页数上限时停止
+        """
+        url = f"{self.host}/api/GetUploadFileList"
+        last_keys = None
+        for page in range(self.MAX_PAGES):
+            payload = {
+                "getAll": False,
+                "itemsPerPage": page_size,
+                "pageNumber": page,
+                "filter": ""
+            }
+            try:
+                response = self._post(url, payload, timeout=10)
+                if response.status_code != 200:
+                    logger.error(f"CloudDrive2 get transfer tasks failed with status: {response.status_code}")
+                    yield None
+                    return
+                data = loads(response.content)
+            except Exception as e:
+                logger.error(f"CloudDrive2 get transfer tasks error: {e}")
+                yield None
+                return
+            items = data.get("uploadFiles") or []
+            keys = [item.get("key") for item in items if isinstance(item, dict)]
+            if keys and keys == last_keys:
+                logger.warning("CloudDrive2 GetUploadFileList returned a repeated page, stop paging")
+                return
+            last_keys = keys
+            yield data
+            total = data.get("totalCount")
+            if len(items) < page_size or (total is not None and (page + 1) * page_size >= total):
+                return
+        logger.warning(f"CloudDrive2 transfer task list exceeds {self.MAX_PAGES} pages, truncated")
+
+    def get_transfer_tasks(self, page_size: int = 100) -> Optional[List[TransferTask]]:
+        """
+        获取传输任务列表，请求失败时返回 None
+        """
+        tasks = []
+        for data in self._transfer_pages(page_size):
+            if data is None:
+                return None
+            tasks.extend(TransferTask.parse_list(data.get("uploadFiles")))
+        return tasks
+
+    def get_offline_tasks(self) -> Optional[List[OfflineTask]]:
+        """
+        获取离线下载任务列表，请求失败时返回 None
         """
-        self._ensure_token()
         url = f"{self.host}/api/ListAllOfflineFiles"
         payload = {
             "page": 0
         }
         try:
-            response = self.session.post(url, json=payload, timeout=10)
+            response = self._post(url, payload, timeout=10)
             if response.status_code == 200:
-                data = response.json()
-                return data.get("offlineFiles", [])
-            return []
+                data = loads(response.content)
+                return OfflineTask.parse_list(data.get("offlineFiles"))
+            logger.error(f"CloudDrive2 get offline tasks failed with status: {response.status_code}")
+            return None
         except Exception as e:
             logger.error(f"CloudDrive2 get offline tasks error: {e}")
-            return []
+            return None
+
+
+class CloudDrive2Pool:
+    """
+    CloudDrive2 多节点池，按队列深度将任务分派到负载最低的健康节点
+    负载由 refresh_loads 在后台 (监控服务) 刷新，分派时只读取缓存的负载
+    """
+    # 节点不可用后的冷却时间 (秒)
+    COOLDOWN = 60
+
+    def __init__(self, nodes: List[CloudDrive2Client]):
+        self.nodes = nodes
+        self._lock = threading.Lock()
+        self._loads: Dict[CloudDrive2Client, int] = {}
+        # 最近一次传输采样得到的各节点传输任务数
+        self._transfers: Dict[CloudDrive2Client, int] = {}
+        self._down_until: Dict[CloudDrive2Client, float] = {}
+
+    def _is_healthy(self, client: CloudDrive2Client) -> bool:
+        return self._down_until.get(client, 0) <= time.time()
+
+    def _mark_down(self, client: CloudDrive2Client):
+        # 丢弃可能已过期的 Token，冷却结束后重新登录
+        client.reset_token()
+        with self._lock:
+            self._down_until[client] = time.time() + self.COOLDOWN
+        logger.warning(f"CloudDrive2 node {client.name} unavailable, cooling down {self.COOLDOWN}s")
+
+    def refresh_loads(self) -> Dict[str, List[OfflineTask]]:
+        """
+        刷新各节点队列深度 (未完成离线任务数 + 最近一次采样的传输任务数)，耗时较长，应在后台调用
+        :return: 健康节点的离线任务，按节点标识分组；获取失败的节点不出现在结果中
+        """
+        tasks = {}
+        for client in self.nodes:
+            if not self._is_healthy(client):
+                continue
+            node_tasks = client.get_offline_tasks()
+            if node_tasks is None:
+                self._mark_down(client)
+                continue
+            tasks[client.name] = node_tasks
+            depth = sum(1 for t in node_tasks if not t.done)
+            with self._lock:
+                self._loads[client] = depth + self._transfers.get(client, 0)
+        return tasks
+
+    def _candidates(self) -> List[CloudDrive2Client]:
+        """
+        按负载从低到高排列的健康节点；全部不可用时退回所有节点
+        """
+        with self._lock:
+            healthy = [c for c in self.nodes if self._is_healthy(c)] or list(self.nodes)
+            return sorted(healthy, key=lambda c: self._loads.get(c, 0))
+
+    def _dispatch(self, method: str, *args) -> bool:
+        for client in self._candidates():
+            result = getattr(client, method)(*args)
+            if result:
+                with self._lock:
+                    self._loads[client] = self._loads.get(client, 0) + 1
+                logger.info(f"CloudDrive2 {method} dispatched to {client.name}")
+                return True
+            if result is not None:
+                # 请求已发出 (如超时)，节点可能已接受任务，不再改投其他节点以免重复添加
+                return False
+            self._mark_down(client)
+            logger.warning(f"CloudDrive2 {method} not accepted by {client.name}, trying next node")
+        return False
+
+    def warmup(self):
+        """
+        登录所有节点，提前建立连接并获取 Token
+        """
+        for client in self.nodes:
+            if not client.token and not client.login():
+                self._mark_down(client)
+
+    def transfer_115_share(self, share_link: str, to_folder: str, password: str = "") -> bool:
+        """
+        转存 115 分享链接到负载最低的节点
+        """
+        return self._dispatch("transfer_115_share", share_link, to_folder, password)
+
+    def add_offline_task(self, url: str, to_folder: str) -> bool:
+        """
+        添加离线任务到负载最低的节点
+        """
+        return self._dispatch("add_offline_task", url, to_folder)
+
+    def get_transfer_tasks(self) -> Dict[str, Optional[List[TransferTask]]]:
+        """
+        获取各节点的传输任务，每个任务标记所属节点 `node`，并记录各节点任务数供负载计算
+        :return: 按节点标识分组的传输任务；节点不可用或获取失败 (含中途某页失败) 时值为 None
+        """
+        tasks = {}
+        for client in self.nodes:
+            node_tasks = client.get_transfer_tasks() if self._is_healthy(client) else None
+            if node_tasks is None:
+                if self._is_healthy(client):
+                    self._mark_down(client)
+                tasks[client.name] = None
+                continue
+            for task in node_tasks:
+                task.node = client.name
+            with self._lock:
+                self._transfers[client] = len(node_tasks)
+            tasks[client.name] = node_tasks
+        return tasks
@@ -1,34 +1,175 @@
 import requests
-from typing import List, Dict, Any, Optional
+import sys
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from app.log import logger
+from .models import loads, SearchItem, Share115, Magnet
+
+
+class NullbrCredential:
+    """
+    单个 Nullbr 凭证及其配额状态
+    """
+
+    def __init__(self, app_id: str, api_key: str):
+        self.app_id = app_id
+        self.api_key = api_key
+        # 服务端返回的剩余配额，未知时为 None
+        self.remaining: Optional[int] = None
+        # 本地请求计数，配额未知时用于轮换
+        self.used = 0
+        self.parked_until = 0.0
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"X-APP-ID": self.app_id, "X-API-KEY": self.api_key}
+
+    def is_parked(self) -> bool:
+        return self.parked_until > time.time()
+
+    def park(self, seconds: float, reason: str = "rate limited"):
+        self.parked_until = time.time() + seconds
+        self.remaining = None
+        logger.warning(f"Nullbr credential {self.app_id} {reason}, parked for {int(seconds)}s")
+
+    def score(self) -> Tuple[int, int]:
+        """
+        调度优先级，剩余配额越多、本地使用越少越优先
+        """
+        remaining = self.remaining if self.remaining is not None else sys.maxsize
+        return -remaining, self.used
+
 
 class NullbrClient:
     BASE_URL = "https://api.nullbr.eu.org"
+    # 无法从响应头获知重置时间时的停用时长 (秒)
+    PARK_SECONDS = 60
+    # 凭证被拒绝 (401/403) 时的停用时长 (秒)
+    AUTH_PARK_SECONDS = 600
+    # 资源缓存默认有效期 (秒)、空结果有效期 (秒) 与最大条目数
+    CACHE_TTL = 24 * 3600
+    EMPTY_CACHE_TTL = 600
+    CACHE_SIZE = 2000
 
-    def __init__(self, app_id: str, api_key: str, cookie: str = None):
+    def __init__(self, app_id: str, api_key: str, cookie: str = None,
+                 extra_credentials: List[Tuple[str, str]] = None):
         self.app_id = app_id
         self.api_key = api_key
         self.cookie = cookie
+        # 已配置 App ID 时，未填写 App ID 的凭证不参与调度；
+        # 全部未填写时保留一个匿名凭证，仅凭 Cookie 发送请求
+        self.credentials = [NullbrCredential(*cred) for cred in [(app_id, api_key)] + list(extra_credentials or [])
+                            if cred[0]] or [NullbrCredential(app_id or "", api_key or "")]
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self.cache_ttl = self.CACHE_TTL
+        # 按线程统计实际发往上游的请求数，缓存命中不计入
+        self._counter = threading.local()
         self.session = requests.Session()
         self.session.headers.update({
-            "User-Agent": "MoviePilot/NullbrCD2",
-            "X-APP-ID": self.app_id,
-            "X-API-KEY": self.api_key
+            "User-Agent": "MoviePilot/NullbrCD2"
         })
         if self.cookie:
             self.session.headers.update({"Cookie": self.cookie})
 
+    def _acquire(self, tried: set) -> Optional[NullbrCredential]:
+        """
+        选取剩余配额最多且未停用的凭证
+        """
+        with self._lock:
+            available = [c for c in self.credentials if id(c) not in tried and not c.is_parked()]
+            if not available:
+                return None
+            cred = min(available, key=NullbrCredential.score)
+            cred.used += 1
+            if cred.remaining:
+                cred.remaining -= 1
+            return cred
+
+    def _update_quota(self, cred: NullbrCredential, response: requests.Response):
+        """
+        根据响应头更新凭证配额，达到上限时停用该凭证
+        """
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.isdigit():
+            cred.remaining = int(remaining)
+        if response.status_code == 429 or cred.remaining == 0:
+            cred.park(self._reset_after(response))
+
+    def _reset_after(self, response: requests.Response) -> float:
+        """
+        从 Retry-After / X-RateLimit-Reset 解析停用时长，后者可能是时间戳或秒数
+        """
+        for header in ("Retry-After", "X-RateLimit-Reset"):
+            value = response.headers.get(header)
+            if value and value.isdigit():
+                seconds = int(value)
+                if seconds > 1e9:
+                    seconds -= time.time()
+                return max(seconds, 1)
+        return self.PARK_SECONDS
+
     def _request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict[str, Any]]:
         url = f"{self.BASE_URL}{endpoint}"
+        tried = set()
+        while True:
+            cred = self._acquire(tried)
+            if not cred:
+                logger.error("Nullbr API request failed: no available credentials")
+                return None
+            tried.add(id(cred))
+            self._counter.value = self.thread_request_count + 1
+            try:
+                response = self.session.request(method, url, headers=cred.headers, timeout=10, **kwargs)
+                self._update_quota(cred, response)
+                if response.status_code == 429:
+                    continue
+                if response.status_code in (401, 403) and cred.app_id:
+                    cred.park(self.AUTH_PARK_SECONDS, f"rejected ({response.status_code})")
+                    continue
+                response.raise_for_status()
+                return loads(response.content)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"Nullbr API request failed: {e}")
+                return None
+
+    @property
+    def thread_request_count(self) -> int:
+        """
+        当前线程累计发往上游的请求数
+        """
+        return getattr(self._counter, "value", 0)
+
+    def warmup(self):
+        """
+        预建立到 Nullbr 的 TCP/TLS 连接，不消耗配额
+        """
         try:
-            response = self.session.request(method, url, timeout=10, **kwargs)
-            response.raise_for_status()
-            return response.json()
+            self.session.head(self.BASE_URL, timeout=5)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Nullbr API request failed: {e}")
-            return None
+            logger.debug(f"Nullbr warmup failed: {e}")
+
+    def _cached_get(self, endpoint: str, field: str) -> Optional[Dict[str, Any]]:
+        """
+        带缓存的 GET 请求，用于资源链接等变化较慢的接口
+        :param field: 资源列表字段，为空时仅短时缓存，以便尽快获取新上线的资源
+        """
+        with self._lock:
+            entry = self._cache.get(endpoint)
+            if entry and entry[0] > time.time():
+                return entry[1]
+        data = self._request("GET", endpoint)
+        if data is not None:
+            with self._lock:
+                self._cache.pop(endpoint, None)
+                while len(self._cache) >= self.CACHE_SIZE:
+                    self._cache.pop(next(iter(self._cache)))
+                ttl = self.cache_ttl if data.get(field) else self.EMPTY_CACHE_TTL
+                self._cache[endpoint] = (time.time() + ttl, data)
+        return data
 
-    def search(self, keyword: str, page: int = 1) -> List[Dict[str, Any]]:
+    def search(self, keyword: str, page: int = 1) -> List[SearchItem]:
         """
         搜索资源
         :param keyword: 关键词
@@ -37,22 +178,22 @@ class NullbrClient:
         """
         data = self._request("GET", "/search", params={"query": keyword, "page": page})
         if data and "items" in data:
-            return data["items"]
+            return SearchItem.parse_list(data["items"])
         return []
 
-    def get_movie_115(self, tmdb_id: int) -> List[Dict[str, Any]]:
+    def get_movie_115(self, tmdb_id: int) -> List[Share115]:
         """
         获取电影 115 资源
         """
-        data = self._request("GET", f"/movie/{tmdb_id}/115")
-        return data.get("115", []) if data else []
+        data = self._cached_get(f"/movie/{tmdb_id}/115", "115")
+        return Share115.parse_list(data.get("115")) if data else []
 
-    def get_movie_magnet(self, tmdb_id: int) -> List[Dict[str, Any]]:
+    def get_movie_magnet(self, tmdb_id: int) -> List[Magnet]:
         """
         获取电影磁力资源
         """
-        data = self._request("GET", f"/movie/{tmdb_id}/magnet")
-        return data.get("magnet", []) if data else []
+        data = self._cached_get(f"/movie/{tmdb_id}/magnet", "magnet")
+        return Magnet.parse_list(data.get("magnet")) if data else []
     
     def get_movie_ed2k(self, tmdb_id: int) -> List[Dict[str, Any]]:
         """
@@ -61,16 +202,16 @@ class NullbrClient:
         data = self._request("GET", f"/movie/{tmdb_id}/ed2k")
         return data.get("ed2k", []) if data else []
 
-    def get_tv_115(self, tmdb_id: int) -> List[Dict[str, Any]]:
+    def get_tv_115(self, tmdb_id: int) -> List[Share115]:
         """
         获取剧集 115 资源 (通常包含全季)
         """
-        data = self._request("GET", f"/tv/{tmdb_id}/115")
-        return data.get("115", []) if data else []
+        data = self._cached_get(f"/tv/{tmdb_id}/115", "115")
+        return Share115.parse_list(data.get("115")) if data else []
 
-    def get_tv_season_magnet(self, tmdb_id: int, season: int) -> List[Dict[str, Any]]:
+    def get_tv_season_magnet(self, tmdb_id: int, season: int) -> List[Magnet]:
         """
         获取剧集单季磁力
         """
-        data = self._request("GET", f"/tv/{tmdb_id}/season/{season}/magnet")
-        return data.get("magnet", []) if data else []
+        data = self._cached_get(f"/tv/{tmdb_id}/season/{season}/magnet", "magnet")
+        return Magnet.parse_list(data.get("magnet")) if data else []
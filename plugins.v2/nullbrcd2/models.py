@@ -0,0 +1,113 @@
+import json
+import urllib.parse
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+TMDB_IMAGE_URL = "https://image.tmdb.org/t/p"
+
+
+def loads(content: bytes) -> Any:
+    """
+    解析 JSON，优先使用 orjson
+    """
+    if orjson:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _poster_url(poster: Optional[str], size: str) -> Optional[str]:
+    if poster and not poster.startswith("http"):
+        return f"{TMDB_IMAGE_URL}/{size}{poster}"
+    return poster
+
+
+class _Model:
+    """
+    响应模型基类，解析时一次性计算派生字段
+    """
+    __slots__ = ()
+
+    @classmethod
+    def parse_list(cls, items: Optional[List[Dict[str, Any]]]) -> list:
+        return [cls(item) for item in items or [] if isinstance(item, dict)]
+
+
+class SearchItem(_Model):
+    """
+    Nullbr 搜索结果
+    """
+    __slots__ = ("tmdb_id", "media_type", "title", "poster_path", "poster", "poster_thumb",
+                 "message_overview", "card_overview", "has_115", "has_magnet")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.tmdb_id = data.get("tmdbid")
+        self.media_type = data.get("media_type")
+        self.title = data.get("title")
+        poster = data.get("poster")
+        self.poster_path = poster if poster and not poster.startswith("http") else None
+        self.poster = _poster_url(poster, "w500")
+        self.poster_thumb = _poster_url(poster, "w200")
+        overview = data.get("overview") or ""
+        self.message_overview = overview[:100] + "..."
+        self.card_overview = overview[:80] + "..." if overview else ""
+        self.has_115 = data.get("115-flg") == 1
+        self.has_magnet = data.get("magnet-flg") == 1
+
+
+class Share115(_Model):
+    """
+    Nullbr 115 分享资源，解析时拆出分享密码
+    """
+    __slots__ = ("title", "size", "share_link", "password")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.title = data.get("title")
+        self.size = data.get("size")
+        self.share_link = data.get("share_link") or ""
+        self.password = ""
+        if "password=" in self.share_link:
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.share_link).query)
+            self.password = query.get("password", [""])[0]
+
+
+class Magnet(_Model):
+    """
+    Nullbr 磁力资源
+    """
+    __slots__ = ("name", "size", "magnet")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.name = data.get("name")
+        self.size = data.get("size")
+        self.magnet = data.get("magnet")
+
+
+class OfflineTask(_Model):
+    """
+    CD2 离线任务
+    """
+    __slots__ = ("uid", "name", "done")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.name = data.get("name")
+        self.uid = data.get("id") or self.name
+        status = data.get("status")
+        self.done = status == "Success" or status == 2
+
+
+class TransferTask(_Model):
+    """
+    CD2 传输 (上传) 任务
+    """
+    __slots__ = ("key", "name", "size", "transferred", "node")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.name = data.get("destPath") or data.get("key")
+        self.key = data.get("key") or self.name
+        self.size = data.get("size") or 0
+        self.transferred = data.get("transferedBytes") or 0
+        self.node: Optional[str] = None
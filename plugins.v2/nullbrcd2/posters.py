@@ -0,0 +1,98 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from app.core.config import settings
+from app.log import logger
+from app.utils.http import RequestUtils
+from .models import TMDB_IMAGE_URL
+
+# 仅接受 TMDB 图片路径，避免路径穿越
+_POSTER_PATH = re.compile(r"^/[A-Za-z0-9_\-]+\.(jpg|jpeg|png|webp)$")
+
+
+class PosterCache:
+    """
+    海报缩略图磁盘缓存，按 w200 尺寸从 TMDB 获取一次，超出容量时按最近访问淘汰
+    访问顺序与文件大小保存在内存索引中，淘汰时不扫描目录
+    """
+    SIZE = "w200"
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        # 文件名 -> 大小，按访问时间从旧到新排列
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        files = []
+        for file in self.root.iterdir():
+            if file.suffix == ".tmp":
+                # 上次写入中断留下的临时文件
+                file.unlink(missing_ok=True)
+            elif file.is_file():
+                stat = file.stat()
+                files.append((stat.st_mtime, file.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._index[name] = size
+        self._total = sum(self._index.values())
+
+    @staticmethod
+    def is_valid(path: str) -> bool:
+        return bool(path and _POSTER_PATH.match(path))
+
+    def get(self, path: str, fetch: bool = True) -> Optional[bytes]:
+        """
+        获取海报，未缓存时从 TMDB 下载
+        :param path: TMDB 海报路径，如 /abc.jpg
+        :param fetch: 未缓存时是否下载
+        """
+        if not self.is_valid(path):
+            return None
+        name = path.lstrip("/")
+        file = self.root / name
+        with self._lock:
+            cached = name in self._index
+            if cached:
+                self._index.move_to_end(name)
+        if cached:
+            try:
+                # 更新访问时间，重启后据此恢复 LRU 顺序
+                os.utime(file)
+                return file.read_bytes()
+            except FileNotFoundError:
+                # 刚被并发的淘汰删除，重新获取
+                pass
+        if not fetch:
+            return None
+        res = RequestUtils(proxies=settings.PROXY, timeout=10).get_res(f"{TMDB_IMAGE_URL}/{self.SIZE}{path}")
+        if not res or res.status_code != 200 or not res.content:
+            logger.warning(f"NullbrCD2 poster fetch failed: {path}")
+            return None
+        content = res.content
+        with self._lock:
+            if name not in self._index:
+                # 先写临时文件再替换，并发读取不会读到写了一半的文件
+                tmp = self.root / f"{name}.tmp"
+                tmp.write_bytes(content)
+                os.replace(tmp, file)
+                self._index[name] = len(content)
+                self._total += len(content)
+                self._evict()
+        return content
+
+    def resize(self, max_bytes: int):
+        """
+        调整容量上限，超出部分立即淘汰
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and self._index:
+            name, size = self._index.popitem(last=False)
+            (self.root / name).unlink(missing_ok=True)
+            self._total -= size
@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Optional
+from app.log import logger
+
+
+class FairScheduler:
+    """
+    按用户分队列、轮询出队的任务调度器
+    - 全局并发数由工作线程数限制
+    - 相同 key 的任务在排队或执行期间只保留一个
+    """
+    # submit 的返回值：调度器已停止，任务未被接受
+    STOPPED = -1
+
+    def __init__(self, max_workers: int = 2):
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._keys = set()
+        self._cond = threading.Condition()
+        self._running = True
+        # 停止后接收新任务与未执行任务的调度器
+        self._successor: Optional["FairScheduler"] = None
+        self.max_workers = max_workers
+        for i in range(max(1, max_workers)):
+            threading.Thread(target=self._worker, name=f"nullbrcd2-worker-{i}", daemon=True).start()
+
+    def submit(self, user: str, key: Optional[str], func: Callable, *args: Any,
+               on_queued: Callable[[int], Any] = None) -> Optional[int]:
+        """
+        提交任务
+        :param user: 用户标识，同一用户的任务按提交顺序执行
+        :param key: 去重键，为空则不去重
+        :param on_queued: 任务被接受后、开始执行前的回调，参数为排队位置，用于先行发送排队提示
+        :return: 前方排队的任务数；与已有任务重复时返回 None；调度器已停止时返回 STOPPED
+        """
+        with self._cond:
+            if not self._running:
+                return self.STOPPED
+            if key and key in self._keys:
+                return None
+            if key:
+                self._keys.add(key)
+            queue = self._queues.get(user)
+            position = self._position(user, len(queue) if queue else 0)
+        if on_queued:
+            try:
+                on_queued(position)
+            except Exception as e:
+                logger.error(f"NullbrCD2 queue callback failed: {e}")
+        if not self._enqueue(user, key, func, args):
+            return self.STOPPED
+        return position
+
+    def _enqueue(self, user: str, key: Optional[str], func: Callable, args: tuple) -> bool:
+        """
+        将任务加入用户队列；已停止时转交给后继调度器
+        :return: 任务是否被接受
+        """
+        with self._cond:
+            if self._running:
+                if key:
+                    self._keys.add(key)
+                self._queues.setdefault(user, deque()).append((key, func, args))
+                self._cond.notify()
+                return True
+            if key:
+                self._keys.discard(key)
+            successor = self._successor
+        return successor._enqueue(user, key, func, args) if successor else False
+
+    def _position(self, user: str, index: int) -> int:
+        """
+        轮询顺序下任务前方的排队数：其他用户最多各有 index (+1，若其轮次在前) 个任务先于它执行
+        用户当前没有排队任务时视为排在轮次末尾
+        """
+        position = index
+        ahead = True
+        for other, queue in self._queues.items():
+            if other == user:
+                ahead = False
+                continue
+            position += min(len(queue), index + 1 if ahead else index)
+        return position
+
+    def _next(self):
+        user, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        del self._queues[user]
+        if queue:
+            self._queues[user] = queue
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queues:
+                    self._cond.wait()
+                if not self._queues:
+                    return
+                key, func, args = self._next()
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"NullbrCD2 scheduled task failed: {e}")
+            finally:
+                if key:
+                    with self._cond:
+                        self._keys.discard(key)
+
+    def shutdown(self, successor: "FairScheduler" = None):
+        """
+        停止接收任务，正在执行的任务不受影响
+        :param successor: 接管未执行任务及后续提交的调度器；为空时工作线程执行完已排队的任务后退出
+        """
+        with self._cond:
+            self._running = False
+            self._successor = successor
+            if successor:
+                queues = self._queues
+                self._queues = OrderedDict()
+                for queue in queues.values():
+                    self._keys.difference_update(key for key, _, _ in queue if key)
+            self._cond.notify_all()
+        if successor:
+            for user, queue in queues.items():
+                for key, func, args in queue:
+                    successor._enqueue(user, key, func, args)
@@ -0,0 +1,96 @@
+import threading
+from array import array
+from operator import attrgetter
+from typing import Dict, List, Optional, Set
+from .models import OfflineTask
+
+_uid = attrgetter("uid")
+
+
+class _NodeState:
+    """
+    单个节点上一轮的任务快照
+    """
+    __slots__ = ("signature", "pending", "done")
+
+    def __init__(self, signature: tuple, pending: Set[str], done: array):
+        # (任务数, 首个任务, 末个任务, 任务 ID 序列哈希)，用于快速判断列表是否变化
+        self.signature = signature
+        # 未完成任务 ID，通常只占历史任务的一小部分
+        self.pending = pending
+        # 已完成任务 ID 的哈希值，每个仅占 8 字节
+        self.done = done
+
+
+class TaskStateStore:
+    """
+    离线任务状态存储
+    - 按节点保存未完成任务 ID 集合与已完成任务 ID 哈希数组，不保留 CD2 已不再返回的任务
+    - 以 (任务数, 首个任务, 末个任务, 任务 ID 序列哈希) 作为水位：列表未变或仅在首尾新增任务时，
+      只需比较未完成集合的差集与新增部分，不逐个比对历史任务；序列哈希可发现中间任务被替换
+    - 其他情况 (如删除任务) 重建快照，以哈希数组批量比对
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, _NodeState] = {}
+
+    @staticmethod
+    def _digest(tasks: List[OfflineTask]) -> int:
+        """
+        任务 ID 序列的哈希，列表中间的任务被替换或移动时随之变化
+        """
+        return hash(tuple(map(_uid, tasks)))
+
+    @classmethod
+    def _added(cls, state: _NodeState, tasks: List[OfflineTask], digest: int) -> Optional[List[OfflineTask]]:
+        """
+        相对上一轮新增的任务；列表不是仅在首尾追加时返回 None
+        :param digest: 本轮任务 ID 序列的哈希
+        """
+        count, first, last, previous = state.signature
+        added = len(tasks) - count
+        if added < 0:
+            return None
+        if not added:
+            return [] if digest == previous else None
+        if tasks[added].uid == first and tasks[-1].uid == last:
+            kept, new = tasks[added:], tasks[:added]
+        elif tasks[0].uid == first and tasks[count - 1].uid == last:
+            kept, new = tasks[:count], tasks[count:]
+        else:
+            return None
+        return new if cls._digest(kept) == previous else None
+
+    def update(self, node: str, tasks: List[OfflineTask]) -> List[OfflineTask]:
+        """
+        写入节点本轮的任务列表
+        :param node: 节点标识
+        :param tasks: 该节点本轮获取到的全部离线任务
+        :return: 本轮新完成的任务；节点首轮仅建立基线，不返回历史已完成任务
+        """
+        if not tasks:
+            # 空列表多为 CD2 异常，保留上一轮快照，避免下一轮把历史任务当作新完成
+            return []
+        pending = {task.uid for task in tasks if not task.done}
+        digest = self._digest(tasks)
+        signature = (len(tasks), tasks[0].uid, tasks[-1].uid, digest)
+        with self._lock:
+            state: Optional[_NodeState] = self._nodes.get(node)
+            added = self._added(state, tasks, digest) if state else None
+            if added is not None and pending.issubset(state.pending.union(t.uid for t in added)):
+                finished = state.pending - pending
+                completed = [task for task in tasks if task.uid in finished] if finished else []
+                completed += [task for task in added if task.done]
+                state.signature = signature
+                state.pending = pending
+                state.done.extend(hash(task.uid) for task in completed)
+                return completed
+            # 任务有删除或重排：重建快照，同时丢弃 CD2 已不再返回的任务
+            done_tasks = [(task, hash(task.uid)) for task in tasks if task.done]
+            completed = []
+            if state:
+                known = set(state.done)
+                completed = [task for task, key in done_tasks if key not in known]
+            self._nodes[node] = _NodeState(signature, pending, array("q", [key for _, key in done_tasks]))
+        return completed
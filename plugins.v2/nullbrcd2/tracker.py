@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from .models import TransferTask
+
+
+class TransferTracker:
+    """
+    CD2 传输任务进度追踪，按任务保留滚动的已传输字节采样，计算速率与剩余时间
+    """
+    # 每个任务保留的采样数
+    WINDOW = 10
+    # 采样间隔 (秒)
+    INTERVAL = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+        self._tasks: Dict[str, TransferTask] = {}
+
+    def update(self, node_tasks: Dict[str, Optional[List[TransferTask]]]):
+        """
+        记录一轮采样，已消失的任务及节点会被移除
+        :param node_tasks: 按节点分组的传输任务；值为 None 表示该节点本轮获取失败，保留其上一轮的任务与采样
+        """
+        seen = {}
+        for tasks in node_tasks.values():
+            if tasks is not None:
+                seen.update((f"{task.node}#{task.key}", task) for task in tasks)
+        failed = {node for node, tasks in node_tasks.items() if tasks is None}
+        now = time.time()
+        with self._lock:
+            for key, task in seen.items():
+                samples = self._samples.get(key)
+                if samples is None:
+                    samples = self._samples[key] = deque(maxlen=self.WINDOW)
+                samples.append((now, task.transferred))
+            if failed:
+                seen.update((key, task) for key, task in self._tasks.items() if task.node in failed)
+            for key in self._samples.keys() - seen.keys():
+                del self._samples[key]
+            self._tasks = seen
+
+    def _rate(self, key: str) -> float:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < 2:
+            return 0.0
+        (t0, b0), (t1, b1) = samples[0], samples[-1]
+        if t1 <= t0 or b1 <= b0:
+            return 0.0
+        return (b1 - b0) / (t1 - t0)
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        """
+        汇总统计
+        :param top: 返回速率最高的任务数
+        :return: 任务数、总字节、已传输字节、总速率 (B/s)、剩余时间 (秒，无法估算时为 None) 及任务明细
+        """
+        with self._lock:
+            tasks = []
+            total = transferred = throughput = 0
+            for key, task in self._tasks.items():
+                size = task.size
+                done = task.transferred
+                rate = self._rate(key)
+                total += size
+                transferred += done
+                throughput += rate
+                tasks.append({
+                    "name": task.name,
+                    "node": task.node,
+                    "size": size,
+                    "transferred": done,
+                    "rate": rate,
+                    "eta": self._eta(size - done, rate)
+                })
+        tasks.sort(key=lambda t: t["rate"], reverse=True)
+        return {
+            "count": len(tasks),
+            "total": total,
+            "transferred": transferred,
+            "throughput": throughput,
+            "eta": self._eta(total - transferred, throughput),
+            "tasks": tasks[:top]
+        }
+
+    @staticmethod
+    def _eta(remaining: int, rate: float) -> Optional[int]:
+        if remaining <= 0:
+            return 0
+        if rate <= 0:
+            return None
+        return int(remaining / rate)